@@ -4,12 +4,9 @@
 
 import os
 import sys
-import telnetlib
-
-import pymysql
-import redis
 import pathlib
 import re
+import time
 
 
 def check_env():
@@ -23,7 +20,11 @@ def check_env():
 
     # 检查 环境变量是否设置正确
     try:
+        start = time.perf_counter()
         from chanlun import cl_interface
+
+        print(f"导入 chanlun 模块耗时：{time.perf_counter() - start:.3f}s")
+        print("详细导入耗时可使用：python -X importtime check_env.py")
     except:
         print("无法导入 chanlun 模块，环境变量未设置或设置错误")
         print(f"当前的环境变量如下：{sys.path}")
@@ -42,6 +43,8 @@ def check_env():
     # 检查代理是否设置
     if config.PROXY_HOST != "":
         try:
+            import telnetlib
+
             telnetlib.Telnet(config.PROXY_HOST, config.PROXY_PORT)
         except:
             print("当前设置的 VPN 代理不可用，如不使用数字货币行情，可忽略")
@@ -49,6 +52,8 @@ def check_env():
     # 检查 Redis
     try:
         if config.REDIS_HOST != "":
+            import redis
+
             R = redis.Redis(
                 host=config.REDIS_HOST, port=config.REDIS_PORT, decode_responses=True
             )
@@ -59,6 +64,8 @@ def check_env():
     # 检查 MySQL
     try:
         if config.DB_TYPE == "mysql":
+            import pymysql
+
             pymysql.connect(
                 host=config.DB_HOST,
                 port=config.DB_PORT,
@@ -7,6 +7,8 @@
 
 import sys
 import os
+import random
+import time
 
 # 添加项目根目录到Python路径
 project_root = os.path.abspath('.')
@@ -15,6 +17,7 @@ sys.path.insert(0, os.path.join(project_root, 'src'))
 
 from chanlun.tools.ai_analyse_enhanced import AIAnalyseEnhanced
 from chanlun.tools.knowledge_base import KnowledgeBase
+from integration_example import percentile
 
 def add_custom_knowledge_to_ai(ai: AIAnalyseEnhanced):
     """
@@ -203,10 +206,15 @@ def demonstrate_enhanced_analysis():
     print("4. 可扩展性: 可以随时添加新的知识和经验")
     print("5. 个性化: 可以根据个人交易风格定制知识库")
 
-def test_knowledge_search_performance():
+def test_knowledge_search_performance(rounds: int = 20, corpus_sizes: tuple = (50, 200, 1000)):
     """
     测试知识搜索的性能和准确性
+
+    Args:
+        rounds: 每个查询重复执行的次数，用于统计耗时（至少为1）
+        corpus_sizes: 知识库规模测试的文档数列表，使用合成文档逐级扩充知识库
     """
+    rounds = max(1, rounds)
     print("\n=== 知识搜索性能测试 ===")
     
     ai = AIAnalyseEnhanced("a", kb_name="performance_test_kb")
@@ -224,11 +232,28 @@ def test_knowledge_search_performance():
         "仓位管理技巧"
     ]
     
-    print(f"\n测试 {len(test_queries)} 个搜索查询:")
+    stats = ai.get_knowledge_stats()
+    print(f"\n测试 {len(test_queries)} 个搜索查询 (知识库文档数: {stats['total_documents']}, 每个查询 {rounds} 次):")
     
+    all_durations = []
+    wall_seconds = 0.0
     for i, query in enumerate(test_queries, 1):
         print(f"\n{i}. 查询: '{query}'")
+        
+        # 首次调用单独计时，包含分词、向量化等冷启动开销
+        start = time.perf_counter()
         results = ai.search_knowledge(query, top_k=3)
+        first_ms = (time.perf_counter() - start) * 1000
+        
+        durations = []
+        loop_start = time.perf_counter()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            ai.search_knowledge(query, top_k=3)
+            durations.append((time.perf_counter() - start) * 1000)
+        wall_seconds += time.perf_counter() - loop_start
+        durations.sort()
+        all_durations.extend(durations)
         
         if results:
             print(f"   找到 {len(results)} 个相关结果:")
@@ -236,6 +261,45 @@ def test_knowledge_search_performance():
                 print(f"     {j}. {result['title']} (相似度: {result['similarity']:.3f})")
         else:
             print("   未找到相关结果")
+        print(f"   耗时: 首次 {first_ms:.2f}ms, 平均 {sum(durations) / len(durations):.2f}ms, "
+              f"P95 {percentile(durations, 95):.2f}ms")
+    
+    all_durations.sort()
+    print("\n汇总:")
+    print(f"   总查询次数: {len(all_durations)}")
+    print(f"   平均耗时: {sum(all_durations) / len(all_durations):.2f}ms")
+    print(f"   P50 {percentile(all_durations, 50):.2f}ms, P95 {percentile(all_durations, 95):.2f}ms, "
+          f"最大 {all_durations[-1]:.2f}ms")
+    print(f"   吞吐量: {len(all_durations) / wall_seconds:.1f} 次/秒 (重复查询总墙钟耗时 {wall_seconds:.3f}s)")
+    
+    # 知识库规模测试：使用合成文档逐级扩充独立的知识库，观察检索耗时随文档数的变化
+    print("\n知识库规模测试:")
+    scale_ai = AIAnalyseEnhanced("a", kb_name="performance_scale_kb")
+    rng = random.Random(42)  # 固定种子，保证每次生成的合成文档一致
+    terms = ["一买点", "二买点", "三买点", "背驰", "中枢", "线段", "笔", "分型",
+             "MACD", "成交量", "止损", "仓位", "趋势", "盘整", "突破", "回踩"]
+    categories = ["买卖点实战", "技术指标实战", "中枢实战", "背驰实战", "线段实战", "风险控制"]
+    
+    for size in sorted(corpus_sizes):
+        doc_count = scale_ai.get_knowledge_stats()['total_documents']
+        for n in range(doc_count, size):
+            words = rng.sample(terms, 6)
+            scale_ai.add_knowledge(
+                f"合成知识 {n}: {words[0]}与{words[1]}",
+                f"{'，'.join(words)}。在{words[2]}出现后结合{words[3]}确认{words[4]}，注意{words[5]}。",
+                rng.choice(categories)
+            )
+        doc_count = scale_ai.get_knowledge_stats()['total_documents']
+        
+        durations = []
+        for query in test_queries:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                scale_ai.search_knowledge(query, top_k=3)
+                durations.append((time.perf_counter() - start) * 1000)
+        durations.sort()
+        print(f"   文档数 {doc_count}: 平均 {sum(durations) / len(durations):.2f}ms, "
+              f"P50 {percentile(durations, 50):.2f}ms, P95 {percentile(durations, 95):.2f}ms")
     
     print("\n=== 性能测试完成 ===")
 
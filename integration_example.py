@@ -15,19 +15,49 @@ sys.path.insert(0, os.path.join(project_root, 'src'))
 
 from chanlun.tools.ai_analyse_enhanced import AIAnalyseEnhanced
 from chanlun.tools.ai_analyse import AIAnalyse  # 原始AI分析类
+try:
+    from config_ai_enhanced import ANALYSIS_TYPE_MAPPING
+except ImportError:
+    # 未配置 config_ai_enhanced.py 时使用默认映射，未列出的分析类型搜索所有分类
+    ANALYSIS_TYPE_MAPPING = {
+        'comprehensive': None,  # 搜索所有分类
+        'trading': ['买卖点实战', '技术分析', '实时监控'],
+        'risk': ['风险控制', '市场心理', '止损策略'],
+        'selection': ['选股策略', '板块分析', '市场特点']
+    }
 import json
+import math
 import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
+def percentile(sorted_values: list, percent: float) -> float:
+    """
+    计算已排序列表的百分位数（最近秩法），sorted_values 不能为空
+    """
+    if not sorted_values:
+        raise ValueError("sorted_values 不能为空")
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
 class EnhancedAnalysisService:
     """
     增强分析服务类
     提供统一的AI分析接口，支持原始分析和知识库增强分析
     """
     
-    def __init__(self, market: str = "a", kb_name: str = "production_kb"):
+    # 每个统计项保留的最近耗时样本数，用于计算分位数
+    TIMING_SAMPLE_SIZE = 1000
+    
+    def __init__(self, market: str = "a", kb_name: str = "production_kb",
+                 enable_timing: bool = True):
         self.market = market
         
+        # 各环节耗时统计 {名称: {'count', 'total', 'max', 'samples'}}
+        self.enable_timing = enable_timing
+        self.timings = {}
+        
         # 初始化原始AI分析器
         self.original_ai = AIAnalyse(market)
         
@@ -35,7 +65,82 @@ class EnhancedAnalysisService:
         self.enhanced_ai = AIAnalyseEnhanced(market, kb_name)
         
         # 初始化生产环境知识库
-        self._init_production_knowledge()
+        with self._span('init_knowledge'):
+            self._init_production_knowledge()
+    
+    @contextmanager
+    def _span(self, name: str):
+        """
+        统计代码段耗时，按名称累计调用次数、总耗时、最大耗时，
+        并保留最近 TIMING_SAMPLE_SIZE 个样本用于计算分位数
+        
+        产出的 span 字典在退出时写入 'elapsed'（秒），未开启统计时同样计时，
+        调用方可直接复用该耗时；抛出异常的调用计入 name + '_error'
+        """
+        span = {'elapsed': 0.0}
+        failed = False
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            span['elapsed'] = time.perf_counter() - start
+            if self.enable_timing:
+                self._record_timing(f"{name}_error" if failed else name, span['elapsed'])
+    
+    def _record_timing(self, name: str, elapsed: float):
+        """
+        记录一次耗时样本
+        """
+        stat = self.timings.get(name)
+        if stat is None:
+            stat = self.timings[name] = {
+                'count': 0, 'total': 0.0, 'max': 0.0,
+                'samples': deque(maxlen=self.TIMING_SAMPLE_SIZE)
+            }
+        stat['count'] += 1
+        stat['total'] += elapsed
+        stat['max'] = max(stat['max'], elapsed)
+        stat['samples'].append(elapsed)
+    
+    def get_timing_stats(self) -> dict:
+        """
+        获取各环节耗时统计
+        
+        Returns:
+            dict: {名称: {'count': 调用次数, 'avg_ms': 平均耗时, 'p50_ms', 'p95_ms', 'p99_ms': 最近样本的分位数,
+                         'max_ms': 最大耗时}}
+        """
+        stats = {}
+        for name, stat in self.timings.items():
+            samples = sorted(stat['samples'])
+            stats[name] = {
+                'count': stat['count'],
+                'avg_ms': round(stat['total'] / stat['count'] * 1000, 2),
+                'p50_ms': round(percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(percentile(samples, 95) * 1000, 2),
+                'p99_ms': round(percentile(samples, 99) * 1000, 2),
+                'max_ms': round(stat['max'] * 1000, 2)
+            }
+        return stats
+    
+    def log_timing_stats(self, reset: bool = False):
+        """
+        输出各环节耗时统计，可由调用方定时调用（如 APScheduler 定时任务）
+        
+        Args:
+            reset: 输出后是否清空统计，用于按周期统计
+        """
+        stats = self.get_timing_stats()
+        print(f"[{datetime.now().isoformat()}] 耗时统计:")
+        for name, stat in stats.items():
+            print(f"  {name}: 次数 {stat['count']}, 平均 {stat['avg_ms']}ms, P50 {stat['p50_ms']}ms, "
+                  f"P95 {stat['p95_ms']}ms, P99 {stat['p99_ms']}ms, 最大 {stat['max_ms']}ms")
+        if reset:
+            self.timings = {}
+        return stats
     
     def _init_production_knowledge(self):
         """
@@ -80,6 +185,31 @@ class EnhancedAnalysisService:
                 "title": "情绪周期与市场节奏",
                 "content": "市场情绪周期：绝望→希望→乐观→兴奋→贪婪→恐惧→绝望。在不同情绪阶段采用不同策略：绝望期逐步建仓，希望期加仓，乐观期减仓，兴奋期清仓。结合缠论买卖点，可以更精确地把握市场节奏。",
                 "category": "市场心理"
+            },
+            {
+                "title": "MACD辅助判断背驰",
+                "content": "用MACD辅助判断背驰：1）比较相邻两段同向走势对应的MACD红绿柱面积；2）后一段价格创新高（低）而面积缩小即为背驰；3）黄白线回抽零轴后的再次离开更具参考价值。指标只是辅助，最终以走势结构为准。",
+                "category": "技术指标实战"
+            },
+            {
+                "title": "盘整背驰与趋势背驰的区别",
+                "content": "趋势背驰发生在至少两个同向中枢之后，力度衰竭往往引发较大级别的反转；盘整背驰只有一个中枢，通常只回到中枢内部。实战中趋势背驰对应一买一卖，盘整背驰更多用于短线高抛低吸。",
+                "category": "背驰实战"
+            },
+            {
+                "title": "线段破坏的确认",
+                "content": "线段破坏的确认：1）第一种情况，特征序列无缺口，出现顶（底）分型即确认；2）第二种情况，特征序列有缺口，需要反向特征序列出现分型才能确认。实战中线段破坏往往是次级别买卖点出现的信号。",
+                "category": "线段实战"
+            },
+            {
+                "title": "中枢的移动与扩展",
+                "content": "中枢移动：后一中枢与前一中枢没有重叠，说明趋势延续；中枢扩展：两个中枢的波动区间出现重叠，级别升级为更大中枢。实战中中枢上移持有，中枢扩展时降低仓位等待方向选择。",
+                "category": "中枢实战"
+            },
+            {
+                "title": "中枢的定义与区间",
+                "content": "中枢由至少三个连续次级别走势类型的重叠部分构成，区间上沿取各段高点的最低值，下沿取各段低点的最高值。中枢是缠论走势分解的核心，买卖点、背驰均以中枢为参照。",
+                "category": "中枢理论"
             }
         ]
         
@@ -105,32 +235,35 @@ class EnhancedAnalysisService:
             code: 股票代码
             frequency: 时间周期
             use_enhanced: 是否使用增强分析
-            analysis_type: 分析类型 (comprehensive, trading, risk)
+            analysis_type: 分析类型 (见 config_ai_enhanced.ANALYSIS_TYPE_MAPPING)
         
         Returns:
             dict: 分析结果
         """
-        start_time = time.time()
+        # analyse_with_knowledge 内部包含知识库检索和LLM调用，两者合并计时
+        span_name = 'analyse_with_knowledge' if use_enhanced else 'analyse'
+        span = {'elapsed': 0.0}
         
         try:
-            if use_enhanced:
-                # 根据分析类型选择知识库分类
-                categories = self._get_categories_by_type(analysis_type)
-                
-                result = self.enhanced_ai.analyse_with_knowledge(
-                    code=code,
-                    frequency=frequency,
-                    use_knowledge=True,
-                    knowledge_categories=categories,
-                    max_knowledge_docs=3
-                )
-            else:
-                # 使用原始分析
-                result = self.original_ai.analyse(code, frequency)
+            with self._span(span_name) as span:
+                if use_enhanced:
+                    # 根据分析类型选择知识库分类
+                    categories = self._get_categories_by_type(analysis_type)
+                    
+                    result = self.enhanced_ai.analyse_with_knowledge(
+                        code=code,
+                        frequency=frequency,
+                        use_knowledge=True,
+                        knowledge_categories=categories,
+                        max_knowledge_docs=3
+                    )
+                else:
+                    # 使用原始分析
+                    result = self.original_ai.analyse(code, frequency)
             
             # 添加分析元信息
             result['analysis_time'] = datetime.now().isoformat()
-            result['analysis_duration'] = round(time.time() - start_time, 2)
+            result['analysis_duration'] = round(span['elapsed'], 2)
             result['analysis_type'] = 'enhanced' if use_enhanced else 'original'
             result['code'] = code
             result['frequency'] = frequency
@@ -142,7 +275,7 @@ class EnhancedAnalysisService:
                 'ok': False,
                 'msg': f'分析过程中出现错误: {str(e)}',
                 'analysis_time': datetime.now().isoformat(),
-                'analysis_duration': round(time.time() - start_time, 2),
+                'analysis_duration': round(span['elapsed'], 2),
                 'analysis_type': 'error',
                 'code': code,
                 'frequency': frequency
@@ -151,23 +284,26 @@ class EnhancedAnalysisService:
     def _get_categories_by_type(self, analysis_type: str) -> list:
         """
         根据分析类型获取相关的知识库分类
-        """
-        category_mapping = {
-            'comprehensive': None,  # 搜索所有分类
-            'trading': ['买卖点实战', '技术分析', '实时监控'],
-            'risk': ['风险控制', '市场心理', '止损策略'],
-            'selection': ['选股策略', '板块分析', '市场特点']
-        }
         
-        return category_mapping.get(analysis_type, None)
+        返回分类列表的副本，调用方修改不会影响配置中的映射；None 表示搜索所有分类
+        """
+        categories = ANALYSIS_TYPE_MAPPING.get(analysis_type, None)
+        return list(categories) if categories is not None else None
     
-    def batch_analyze(self, stock_list: list, frequency: str = "30m") -> dict:
+    def batch_analyze(self, stock_list: list, frequency: str = "30m",
+                      prefilter=None, prefilter_fallback: bool = False) -> dict:
         """
         批量分析股票
         
         Args:
             stock_list: 股票代码列表
             frequency: 时间周期
+            prefilter: 可选的预筛选函数 prefilter(stock_list, frequency) -> 通过的代码列表，
+                       用于在本地一次性评估所有代码的缠论信号（如买卖点、背驰），
+                       只有通过筛选的代码才会进入知识库检索和AI分析，
+                       summary['skipped_count'] 即为节省的 analyse_with_knowledge 调用次数
+            prefilter_fallback: 预筛选抛出异常时是否退回到分析全部股票；默认不分析任何股票直接返回，
+                                避免筛选函数出错时产生全量的AI调用。两种情况都会设置 summary['prefilter_failed']
         
         Returns:
             dict: 批量分析结果
@@ -175,18 +311,39 @@ class EnhancedAnalysisService:
         results = {
             'success': [],
             'failed': [],
+            'skipped': [],
             'summary': {
                 'total': len(stock_list),
                 'success_count': 0,
                 'failed_count': 0,
+                'skipped_count': 0,
+                'prefilter_failed': False,
                 'start_time': datetime.now().isoformat()
             }
         }
         
-        print(f"开始批量分析 {len(stock_list)} 只股票...")
+        analyze_list = stock_list
+        if prefilter is not None:
+            try:
+                with self._span('prefilter'):
+                    passed = set(prefilter(stock_list, frequency))
+                analyze_list = [code for code in stock_list if code in passed]
+                results['skipped'] = [code for code in stock_list if code not in passed]
+                results['summary']['skipped_count'] = len(results['skipped'])
+                print(f"预筛选完成: {len(analyze_list)}/{len(stock_list)} 只股票通过")
+            except Exception as e:
+                results['summary']['prefilter_failed'] = True
+                results['summary']['prefilter_error'] = str(e)
+                if not prefilter_fallback:
+                    print(f"预筛选失败，终止批量分析: {str(e)}")
+                    results['summary']['end_time'] = datetime.now().isoformat()
+                    return results
+                print(f"预筛选失败，将分析全部股票: {str(e)}")
+        
+        print(f"开始批量分析 {len(analyze_list)} 只股票...")
         
-        for i, code in enumerate(stock_list, 1):
-            print(f"正在分析 {i}/{len(stock_list)}: {code}")
+        for i, code in enumerate(analyze_list, 1):
+            print(f"正在分析 {i}/{len(analyze_list)}: {code}")
             
             result = self.analyze_stock(code, frequency, use_enhanced=True)
             
@@ -202,7 +359,8 @@ class EnhancedAnalysisService:
         
         results['summary']['end_time'] = datetime.now().isoformat()
         
-        print(f"批量分析完成: 成功 {results['summary']['success_count']}, 失败 {results['summary']['failed_count']}")
+        print(f"批量分析完成: 成功 {results['summary']['success_count']}, 失败 {results['summary']['failed_count']}, "
+              f"预筛选跳过 {results['summary']['skipped_count']}")
         
         return results
     
@@ -259,6 +417,7 @@ class EnhancedAnalysisService:
                 'total_documents': kb_stats['total_documents'],
                 'categories': kb_stats['categories']
             },
+            'timings': self.get_timing_stats(),
             'status': 'active',
             'timestamp': datetime.now().isoformat()
         }
@@ -302,11 +461,15 @@ def demo_integration():
             # 搜索相关知识示例
             if categories:
                 for category in categories[:1]:  # 只测试第一个分类
-                    results = service.enhanced_ai.search_knowledge(
-                        "分析策略", top_k=2, category=category
-                    )
+                    with service._span('search_knowledge'):
+                        results = service.enhanced_ai.search_knowledge(
+                            "分析策略", top_k=2, category=category
+                        )
                     print(f"     在分类 '{category}' 中找到 {len(results)} 个相关知识")
     
+    # 知识库检索耗时统计
+    service.log_timing_stats()
+    
     # 4. 批量分析示例
     print("\n4. 批量分析示例:")
     print("   注意：实际批量分析需要有效的AI API配置")